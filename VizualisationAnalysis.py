@@ -1,19 +1,44 @@
+import hashlib
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime
+from Analysis import CATEGORICAL_COLUMNS
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Upper bound on customers drawn in the RFM segmentation scatter
+MAX_SEGMENT_POINTS = 20000
+
+# On-disk cache of the plot aggregates, keyed by a fingerprint of the input file,
+# the pandas version and CACHE_VERSION; bump the version whenever an aggregate's computation changes
+CACHE_DIR = '.vizcache'
+CACHE_VERSION = 1
+CACHED_AGGREGATES = [
+    '_monthly', '_daily', '_hourly_dow', '_by_country_sales', '_by_country_orders',
+    '_top_products_rev', '_basket_sizes', '_hourly_basket', '_rfm'
+]
+
+def dataset_fingerprint(file_path):
+    """
+    Cheap fingerprint of a data file from its first MiB and modification time,
+    combined with the pandas version (pickles are not portable across it) and
+    the aggregate cache version
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(1 << 20)
+    stamp = f"{os.path.getmtime(file_path)}:{pd.__version__}:{CACHE_VERSION}".encode()
+    return hashlib.blake2b(head + stamp).hexdigest()[:16]
 
 class CustomerVisualizationAnalysis:
-    def __init__(self, df):
-        self.df = df.copy()
-        self.df['InvoiceDate'] = pd.to_datetime(self.df['InvoiceDate'])
-        self.df['Month'] = self.df['InvoiceDate'].dt.strftime('%Y-%m')
-        self.df['Hour'] = self.df['InvoiceDate'].dt.hour
-        self.df['DayOfWeek'] = self.df['InvoiceDate'].dt.day_name()
+    def __init__(self, df, cache_key=None):
+        # Keep a reference to the caller's frame instead of a widened copy
+        self.df = df
+        self.cache_key = cache_key
         
         # Set default matplotlib style
         plt.style.use('default')
@@ -21,6 +46,115 @@ class CustomerVisualizationAnalysis:
         # Set seaborn default style parameters
         sns.set_theme(style="whitegrid")  # Using set_theme instead of style.use
         sns.set_palette("husl")
+        
+        if not self._load_cached_aggregates():
+            self._prepare_aggregates()
+            self._save_cached_aggregates()
+
+    def _cache_path(self, name):
+        return os.path.join(CACHE_DIR, f"{self.cache_key}{name}.pkl")
+
+    def _load_cached_aggregates(self):
+        """
+        Load previously computed aggregates for this cache key, if all exist;
+        an unreadable cache is treated as a miss
+        """
+        if self.cache_key is None:
+            return False
+        try:
+            paths = [self._cache_path(name) for name in CACHED_AGGREGATES]
+            if not all(os.path.isfile(path) for path in paths):
+                return False
+            aggregates = {name: pd.read_pickle(path)
+                          for name, path in zip(CACHED_AGGREGATES, paths)}
+        except Exception as e:
+            print(f"Warning: could not read cached aggregates: {str(e)}")
+            return False
+        for name, value in aggregates.items():
+            setattr(self, name, value)
+        return True
+
+    def _save_cached_aggregates(self):
+        """
+        Persist the computed aggregates under this cache key, removing those
+        left behind by other keys
+        """
+        if self.cache_key is None:
+            return
+        # Failing to write the cache must not prevent plotting
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            for filename in os.listdir(CACHE_DIR):
+                if not filename.startswith(self.cache_key):
+                    os.remove(os.path.join(CACHE_DIR, filename))
+            for name in CACHED_AGGREGATES:
+                pd.to_pickle(getattr(self, name), self._cache_path(name))
+        except Exception as e:
+            print(f"Warning: could not cache aggregates in {CACHE_DIR}: {str(e)}")
+
+    def _prepare_aggregates(self):
+        """
+        Compute the aggregates shared by the plot methods once, so each plot
+        reads a precomputed result instead of re-scanning the full frame
+        """
+        # Derived date parts are held as separate Series aligned to the
+        # frame's index rather than added as columns
+        if not pd.api.types.is_datetime64_any_dtype(self.df['InvoiceDate']):
+            # Try the dataset's own format on the fast path, then fall back
+            # to inference for any other layout
+            try:
+                self.df['InvoiceDate'] = pd.to_datetime(self.df['InvoiceDate'],
+                                                        format='%Y-%m-%d %H:%M:%S',
+                                                        cache=True)
+            except ValueError:
+                self.df['InvoiceDate'] = pd.to_datetime(self.df['InvoiceDate'], cache=True)
+        invoice_dates = self.df['InvoiceDate']
+        self._month = pd.Series(invoice_dates.values.astype('datetime64[M]'),
+                                index=self.df.index, name='Month')
+        self._hour = invoice_dates.dt.hour.rename('Hour')
+        # Weekday as int8 codes (Monday=0); names are attached only at plot time
+        self._dow = invoice_dates.dt.weekday.astype('int8').rename('DayOfWeek')
+        
+        amount = self.df['TotalAmount']
+        
+        self._monthly = amount.groupby(self._month, observed=True).sum()
+        
+        self._daily = amount.groupby(self._dow, observed=True).mean().reindex(range(7))
+        self._daily.index = DAY_NAMES
+        
+        # Day-by-hour sales matrix via a weighted bincount over the int codes,
+        # keeping only the hours in which any trading happened
+        dow = self._dow.to_numpy().astype(np.intp)
+        hour = self._hour.to_numpy().astype(np.intp)
+        hourly_dow = np.bincount(dow * 24 + hour, weights=amount.to_numpy(),
+                                 minlength=7 * 24).reshape(7, 24)
+        traded_hours = np.flatnonzero(np.bincount(hour, minlength=24))
+        self._hourly_dow = pd.DataFrame(hourly_dow[:, traded_hours],
+                                        index=pd.Index(DAY_NAMES, name='DayOfWeek'),
+                                        columns=pd.Index(traded_hours, name='Hour'))
+        
+        self._by_country_sales = self.df.groupby('Country', observed=True)['TotalAmount'].sum().reset_index()
+        self._by_country_orders = self.df.groupby('Country', observed=True)['Invoice'].nunique().reset_index()
+        
+        self._top_products_rev = self.df.groupby('Description', observed=True)['TotalAmount'].sum()\
+            .nlargest(10).sort_values()
+        
+        self._basket_sizes = self.df.groupby('Invoice', observed=True)['Quantity'].sum()
+        self._hourly_basket = amount.groupby(self._hour, observed=True).mean()
+        
+        # RFM metrics, using built-in reducers only so every column takes the
+        # Cython path; recency is derived from the last purchase date afterwards
+        current_date = invoice_dates.max()
+        self._rfm = self.df.groupby('Customer ID', observed=True).agg({
+            'InvoiceDate': 'max',
+            'Invoice': 'count',
+            'TotalAmount': 'sum'
+        }).rename(columns={
+            'InvoiceDate': 'Recency',
+            'Invoice': 'Frequency',
+            'TotalAmount': 'Monetary'
+        })
+        self._rfm['Recency'] = (current_date - self._rfm['Recency']).dt.days.astype('int32')
 
     def plot_sales_trends(self):
         """
@@ -28,7 +162,7 @@ class CustomerVisualizationAnalysis:
         """
         try:
             # Monthly sales trend
-            monthly_sales = self.df.groupby('Month')['TotalAmount'].sum().reset_index()
+            monthly_sales = self._monthly.reset_index()
             
             fig = make_subplots(rows=2, cols=1, subplot_titles=('Monthly Sales Trend', 'Daily Sales Pattern'))
             
@@ -42,9 +176,7 @@ class CustomerVisualizationAnalysis:
             )
             
             # Daily pattern
-            daily_sales = self.df.groupby('DayOfWeek')['TotalAmount'].mean().reindex([
-                'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
-            ])
+            daily_sales = self._daily
             
             fig.add_trace(
                 go.Bar(x=daily_sales.index, y=daily_sales.values,
@@ -65,29 +197,28 @@ class CustomerVisualizationAnalysis:
         Create a heatmap showing sales patterns by hour and day
         """
         try:
-            hourly_sales = self.df.pivot_table(
-                values='TotalAmount',
-                index='DayOfWeek',
-                columns='Hour',
-                aggfunc='sum'
-            ).reindex(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+            hourly_sales = self._hourly_dow
+
+            values = hourly_sales.to_numpy()
 
-            plt.figure(figsize=(15, 8))
+            fig, ax = plt.subplots(figsize=(15, 8))
+            
+            # Draw the matrix as a single image rather than per-cell patches
+            image = ax.imshow(values, aspect='auto', cmap='YlOrRd')
+            fig.colorbar(image, ax=ax, label='Total Sales')
             
-            # Create heatmap with custom parameters
-            heatmap = sns.heatmap(hourly_sales, 
-                                 cmap='YlOrRd', 
-                                 annot=True, 
-                                 fmt='.0f',
-                                 cbar_kws={'label': 'Total Sales'})
+            for (row, col), value in np.ndenumerate(values):
+                ax.text(col, row, f'{value:.0f}', ha='center', va='center', fontsize=7)
             
-            plt.title('Sales Heatmap by Hour and Day of Week', pad=20)
-            plt.xlabel('Hour of Day', labelpad=10)
-            plt.ylabel('Day of Week', labelpad=10)
+            ax.set_title('Sales Heatmap by Hour and Day of Week', pad=20)
+            ax.set_xlabel('Hour of Day', labelpad=10)
+            ax.set_ylabel('Day of Week', labelpad=10)
             
-            # Rotate x-axis labels for better readability
-            plt.xticks(rotation=0)
-            plt.yticks(rotation=0)
+            ax.set_xticks(range(values.shape[1]))
+            ax.set_xticklabels(hourly_sales.columns, rotation=0)
+            ax.set_yticks(range(values.shape[0]))
+            ax.set_yticklabels(hourly_sales.index, rotation=0)
+            ax.grid(False)
             
             plt.tight_layout()
             plt.show()
@@ -99,36 +230,55 @@ class CustomerVisualizationAnalysis:
         Create RFM-based customer segmentation visualization
         """
         try:
-            # Calculate RFM metrics
-            current_date = self.df['InvoiceDate'].max()
+            # Log transform for better visualization
+            rfm_log = np.log1p(self._rfm)
             
-            rfm = self.df.groupby('Customer ID').agg({
-                'InvoiceDate': lambda x: (current_date - x.max()).days,
-                'Invoice': 'count',
-                'TotalAmount': 'sum'
-            }).rename(columns={
-                'InvoiceDate': 'Recency',
-                'Invoice': 'Frequency',
-                'TotalAmount': 'Monetary'
-            })
+            # Plot a fixed-seed random sample of customers; the density of the
+            # scatter is unchanged and the browser stays responsive
+            n_customers = len(rfm_log)
+            sample_idx = np.random.default_rng(0).choice(
+                n_customers, size=min(n_customers, MAX_SEGMENT_POINTS), replace=False)
+            rfm_sample = rfm_log.iloc[np.sort(sample_idx)]
             
-            # Log transform for better visualization
-            rfm_log = np.log1p(rfm)
+            marker = dict(
+                color=rfm_sample['Monetary'],
+                colorscale='Plasma',
+                colorbar=dict(title='Monetary (log)'),
+                size=rfm_sample['Frequency'],
+                sizemode='area',
+                sizeref=2 * rfm_sample['Frequency'].max() / 20 ** 2,
+                opacity=0.7
+            )
             
-            fig = px.scatter_3d(rfm_log, 
-                               x='Recency', 
-                               y='Frequency', 
-                               z='Monetary',
-                               color='Monetary', 
-                               size='Frequency',
-                               title='3D Customer Segmentation based on RFM Analysis')
+            # 2D WebGL projections instead of an SVG 3D scatter
+            fig = make_subplots(rows=1, cols=2,
+                               subplot_titles=('Recency vs Monetary',
+                                             'Frequency vs Monetary'))
+            
+            fig.add_trace(
+                go.Scattergl(x=rfm_sample['Recency'], y=rfm_sample['Monetary'],
+                            mode='markers', name='Recency vs Monetary',
+                            marker=marker),
+                row=1, col=1
+            )
+            
+            fig.add_trace(
+                go.Scattergl(x=rfm_sample['Frequency'], y=rfm_sample['Monetary'],
+                            mode='markers', name='Frequency vs Monetary',
+                            marker=dict(marker, showscale=False)),
+                row=1, col=2
+            )
+            
+            fig.update_xaxes(title_text='Recency (log)', row=1, col=1)
+            fig.update_xaxes(title_text='Frequency (log)', row=1, col=2)
+            fig.update_yaxes(title_text='Monetary (log)', row=1, col=1)
+            fig.update_yaxes(title_text='Monetary (log)', row=1, col=2)
             
             fig.update_layout(
-                scene = dict(
-                    xaxis_title='Recency (log)',
-                    yaxis_title='Frequency (log)',
-                    zaxis_title='Monetary (log)'
-                )
+                height=600,
+                showlegend=False,
+                title_text='Customer Segmentation based on RFM Analysis',
+                title_x=0.5
             )
             
             fig.show()
@@ -141,8 +291,7 @@ class CustomerVisualizationAnalysis:
         """
         try:
             # Top products by revenue
-            top_products = self.df.groupby('Description')['TotalAmount'].sum()\
-                .sort_values(ascending=True).tail(10)
+            top_products = self._top_products_rev
 
             fig = go.Figure(go.Bar(
                 x=top_products.values,
@@ -171,8 +320,9 @@ class CustomerVisualizationAnalysis:
         Create geographical analysis of customers
         """
         try:
-            country_sales = self.df.groupby('Country')['TotalAmount'].sum().reset_index()
-            country_orders = self.df.groupby('Country')['Invoice'].nunique().reset_index()
+            # Top 10 countries, in ascending order for the bar charts
+            top_sales = self._by_country_sales.nlargest(10, 'TotalAmount').sort_values('TotalAmount')
+            top_orders = self._by_country_orders.nlargest(10, 'Invoice').sort_values('Invoice')
             
             fig = make_subplots(rows=1, cols=2, 
                                subplot_titles=('Total Sales by Country', 
@@ -181,8 +331,8 @@ class CustomerVisualizationAnalysis:
             
             # Sales by country
             fig.add_trace(
-                go.Bar(x=country_sales.sort_values('TotalAmount', ascending=True).tail(10)['Country'],
-                      y=country_sales.sort_values('TotalAmount', ascending=True).tail(10)['TotalAmount'],
+                go.Bar(x=top_sales['Country'],
+                      y=top_sales['TotalAmount'],
                       name='Total Sales',
                       marker_color='#3498db'),
                 row=1, col=1
@@ -190,8 +340,8 @@ class CustomerVisualizationAnalysis:
             
             # Orders by country
             fig.add_trace(
-                go.Bar(x=country_orders.sort_values('Invoice', ascending=True).tail(10)['Country'],
-                      y=country_orders.sort_values('Invoice', ascending=True).tail(10)['Invoice'],
+                go.Bar(x=top_orders['Country'],
+                      y=top_orders['Invoice'],
                       name='Number of Orders',
                       marker_color='#e74c3c'),
                 row=1, col=2
@@ -214,23 +364,26 @@ class CustomerVisualizationAnalysis:
         """
         try:
             # Calculate basket sizes
-            basket_sizes = self.df.groupby('Invoice')['Quantity'].sum()
+            basket_sizes = self._basket_sizes
             
             fig = make_subplots(rows=1, cols=2, 
                                subplot_titles=('Basket Size Distribution', 
                                              'Average Basket Value by Hour'))
             
-            # Basket size distribution
+            # Basket size distribution, binned here so only the bar heights
+            # are sent to the browser instead of every invoice
+            counts, edges = np.histogram(basket_sizes.to_numpy(), bins=50)  # Adjust number of bins
             fig.add_trace(
-                go.Histogram(x=basket_sizes, 
-                            name='Basket Size',
-                            marker_color='#9b59b6',
-                            nbinsx=50),  # Adjust number of bins
+                go.Bar(x=(edges[:-1] + edges[1:]) / 2,
+                      y=counts,
+                      width=np.diff(edges),
+                      name='Basket Size',
+                      marker_color='#9b59b6'),
                 row=1, col=1
             )
             
             # Average basket value by hour
-            hourly_basket = self.df.groupby('Hour')['TotalAmount'].mean()
+            hourly_basket = self._hourly_basket
             
             fig.add_trace(
                 go.Scatter(x=hourly_basket.index, 
@@ -254,11 +407,24 @@ class CustomerVisualizationAnalysis:
 
 def main():
     try:
-        # Load the processed dataset
-        df = pd.read_csv('uk_retail_processed.csv')
+        # Load the processed dataset, falling back to the CSV export when
+        # Analysis.py has not yet produced the Parquet file
+        file_path = 'uk_retail_processed.parquet'
+        if os.path.exists(file_path):
+            df = pd.read_parquet(file_path)
+        else:
+            file_path = 'uk_retail_processed.csv'
+            df = pd.read_csv(file_path)
+        
+        # Parquet does not restore every categorical (e.g. the float
+        # Customer ID) and the CSV keeps none, so re-apply them here
+        for column in CATEGORICAL_COLUMNS:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
         
-        # Create visualization object
-        viz = CustomerVisualizationAnalysis(df)
+        # Create visualization object, reusing cached aggregates while the
+        # processed file is unchanged
+        viz = CustomerVisualizationAnalysis(df, cache_key=dataset_fingerprint(file_path))
         
         # Generate all visualizations
         print("Generating sales trends visualization...")